@@ -5,129 +5,350 @@ It supports logical operations such as AND, OR, XOR, and NOT, and can handle cyc
 It provides explanations for the reasoning behind each fact's truth value.
 
 Dependencies:
-    - collections
+    - dataclasses
     - typing
-    - truth: Contains the Truth enumeration for representing truth values (TRUE, FALSE, UNKNOWN).
+    - truth: Contains the integer codes for representing truth values (TRUE, FALSE, UNKNOWN) and their truth tables.
     - graph: Contains definitions for FactV and RuleV, which represent vertices in the reasoning graph.
-    - parser.py: Contains definitions for Rule, Node, FactNode, UnaryNode, BinaryNode, and TokenType.
+    - parser.py: Contains definitions for Rule, Node, TokenType and the node kinds (KIND_FACT, KIND_UNARY, KIND_BINARY).
 
 """
 
-from collections import defaultdict
-from typing import Dict, List, Set
-from truth import Truth
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterator, List, Sequence, Set, Tuple
+from truth import TRUE, FALSE, UNKNOWN, NOT_TABLE, AND_TABLE, OR_TABLE, XOR_TABLE
 from graph import FactV, RuleV
-from parser import Rule, Node, FactNode, UnaryNode, BinaryNode, TokenType
+from parser import Rule, Node, TokenType, KIND_FACT, KIND_UNARY, KIND_BINARY
 
 
-def _collect_facts(node: Node, bucket: Set[str]) -> None:
+
+def _iter_bits(mask: int) -> Iterator[int]:
     """
-    Recursively collects all fact names from a node and adds them to the provided bucket.
-    This function traverses the node structure and gathers all fact names that are part of the node.
-    It handles different types of nodes (FactNode, UnaryNode, BinaryNode) and adds fact names to the bucket.
-    This is used to gather all facts that are part of a rule or conclusion.
+    Yields the positions of the bits set in a bitmask, lowest first.
 
-    @param node: The node to traverse and collect facts from.
-    @type node: Node
-    @param bucket: A set to which the collected fact names will be added.
-    @type bucket: Set[str]
+    @param mask: The bitmask.
+    @type mask: int
 
-    @return: None
+    @return: An iterator over the positions of the set bits.
+    @rtype: Iterator[int]
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# Truth table of each binary operator, indexed by token type
+_BINARY_TABLES = {
+    TokenType.AND: AND_TABLE,
+    TokenType.OR: OR_TABLE,
+    TokenType.XOR: XOR_TABLE,
+}
+
+# Left operand value that decides an AND/OR node alone (XOR has none)
+_ABSORBING = {
+    TokenType.AND: FALSE,
+    TokenType.OR: TRUE,
+}
+
+
+# Opcodes of the compiled expression code, see ExpertSystem.code_op
+OP_FACT = 0    # push the truth value of the fact whose id is the argument, solving it first if needed
+OP_CHECK = 1   # argument (node uid, end): push TRUE and jump to end if the node is in true_nodes
+OP_NOT = 2     # negate the value on top of the stack
+OP_BINARY = 3  # combine the two values on top of the stack with the truth table in the argument
+OP_SKIP = 4    # argument (value, end): jump to end if the value on top of the stack is value
+OP_RET = 5     # end of the code, the value on top of the stack is its result
+
+# Role of a rule with respect to a fact of its conclusions, see RuleV.conc_role
+ROLE_GUARANTEES = 0  # the rule sets the fact true when it fires
+ROLE_NEGATES = 1     # the rule sets the fact false when it fires
+ROLE_DISJUNCTIVE = 2 # the conclusions mention the fact but do not decide it
+
+# Reasoning steps recorded in ExpertSystem.reason_log as (step, rule text) and formatted by explain
+_REASONS = (
+    "No data about {fact}.",
+    "{fact} is an initial fact.",
+    "{fact} is already known to be TRUE.",
+    "{fact} is already known to be FALSE.",
+    "Rule '{rule}' fires and conclusively sets {fact} true.",
+    "Rule '{rule}' fires and conclusively sets {fact} false.",
+    "Rule '{rule}' fires but does not uniquely identify {fact}.",
+    "Contradiction: some rules set {fact} true, others false.",
+    "Cycle detected while evaluating {fact}.",
+    "No rule proved {fact}; keeping default FALSE.",
+)
+(_NO_DATA, _INITIAL, _KNOWN_TRUE, _KNOWN_FALSE, _SETS_TRUE, _SETS_FALSE,
+ _NOT_UNIQUE, _CONTRADICTION, _CYCLE, _DEFAULT_FALSE) = range(len(_REASONS))
+
+# Kinds of entries on the work stack of ExpertSystem._eval_iter
+_CODE = 0    # run compiled code from the offset in the argument
+_SOLVE = 1   # start solving the fact whose id is the argument
+_RULES = 2   # evaluate the next rule concluding a fact
+
+
+@dataclass(slots=True)
+class _SolveFrame:
+    """
+    State of a fact being solved by the iterative evaluator, kept while its rules are tried.
+
+    @ivar fact: The name of the fact being solved.
+    @type fact: str
+    @ivar fact_v: The vertex of the fact being solved.
+    @type fact_v: FactV
+    @ivar rules: Iterator over the ids of the rules that conclude the fact and have not been tried yet.
+    @type rules: Iterator[int]
+    @ivar disjunctive: The ids of the rules that mention the fact in a disjunctive conclusion,
+        tried only when no decisive rule proved it; emptied once they are.
+    @type disjunctive: Sequence[int]
+    @ivar rule: The rule whose premise is being evaluated, None before the first one.
+    @type rule: RuleV | None
+    @ivar proved_true: Whether a rule conclusively set the fact true.
+    @type proved_true: bool
+    @ivar proved_false: Whether a rule conclusively set the fact false.
+    @type proved_false: bool
+    @ivar unknown_due_to_disjunction: Whether a rule left the fact undetermined.
+    @type unknown_due_to_disjunction: bool
     """
-    if isinstance(node, FactNode):
-        bucket.add(node.name)
-    elif isinstance(node, UnaryNode):
-        _collect_facts(node.child, bucket)
-    elif isinstance(node, BinaryNode):
-        _collect_facts(node.left,  bucket)
-        _collect_facts(node.right, bucket)
+    fact: str
+    fact_v: FactV
+    rules: Iterator[int]
+    disjunctive: Sequence[int]
+    rule: RuleV | None = None
+    proved_true: bool = False
+    proved_false: bool = False
+    unknown_due_to_disjunction: bool = False
 
 
 class ExpertSystem:
     """
     Represents the expert system that processes rules and facts to answer queries.
 
-    @ivar reason_log: A dictionary mapping facts to lists of reasoning steps explaining their truth value.
-    @type reason_log: Dict[str, List[str]]
-    @ivar cycles: A set of facts that are part of cycles in the reasoning graph.
-    @type cycles: Set[str]
-    @ivar true_nodes: A list of nodes that are guaranteed to be true.
-    @type true_nodes: List[str]
+    @ivar explain_enabled: Whether reasoning steps are recorded for L{explain}.
+    @type explain_enabled: bool
+    @ivar reason_log: A dictionary mapping facts to lists of reasoning steps explaining their truth value,
+        each stored as a (step, rule text) pair and only formatted by L{explain}.
+    @type reason_log: Dict[str, List[Tuple[int, str | None]]]
+    @ivar cycles: Bitmask of the ids of the facts met again while being solved (bit fid is set).
+    @type cycles: int
+    @ivar true_nodes: The uids (see Node.uid) of the fired conclusions, guaranteed to be true.
+    @type true_nodes: Set[int]
     @ivar facts: A dictionary mapping fact names to their corresponding FactV objects.
     @type facts: Dict[str, FactV]
     @ivar rules: A list of RuleV objects representing the rules defined in the system.
     @type rules: List[RuleV]
+    @ivar fact_list: The FactV objects indexed by fact id, the bit position of the fact letter
+        (see parser.fact_bit); None for the letters no rule or initial fact mentions.
+    @type fact_list: List[FactV | None]
+    @ivar fact_to_rules: The ids of the rules that guarantee or negate each fact, indexed by fact id.
+    @type fact_to_rules: List[List[int]]
+    @ivar fact_to_disjunctive: The ids of the rules that conclude each fact only disjunctively, indexed by fact id.
+    @type fact_to_disjunctive: List[List[int]]
+    @ivar code_op: The opcodes of the compiled expressions, stored back to back.
+    @type code_op: List[int]
+    @ivar code_arg: The argument of each opcode in L{code_op}.
+    @type code_arg: List[object]
     """
-    def __init__(self, rules: List[Rule], facts_init: Set[str]):
+    def __init__(self, rules: List[Rule], facts_init: int, explain: bool = False):
         """
         Initializes the expert system with given rules and initial facts.
 
         @param rules: List of rules defining the logic of the expert system.
         @type rules: List[Rule]
-        @param facts_init: Set of initial facts known to the system.
-        @type facts_init: Set[str]
+        @param facts_init: Bitmask of the initial facts known to the system (see parser.fact_bit).
+        @type facts_init: int
+        @param explain: Whether to record the reasoning steps printed by L{explain}.
+        @type explain: bool
         """
-        self.reason_log: Dict[str, List[str]] = defaultdict(list)
-        self.cycles: Set[str] = set()
-        self.true_nodes = list()
+        self.explain_enabled = explain
+        self.reason_log: Dict[str, List[Tuple[int, str | None]]] = {}
+        self.cycles = 0
+        self.true_nodes: Set[int] = set()
 
         # Global graph of facts and rules
         self.facts: Dict[str, FactV] = {}
+        # Facts indexed by fact id, set below
+        self.fact_list: List[FactV | None] = []
         self.rules: List[RuleV] = []
-
-        def fv(name: str) -> FactV:
-            if name not in self.facts:
-                self.facts[name] = FactV(name)
-            return self.facts[name]
-
-        for f in facts_init:
-            fact_v = fv(f)
-            fact_v.state = Truth.TRUE
-            fact_v.initial_fact = True
+        # Node uid -> (guaranteed facts, negated facts) of a conclusion, see _conclusion_sets
+        self._conclusions: Dict[int, Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+
+        # Expressions compiled to postfix code in two parallel lists, see _compile
+        self.code_op: List[int] = []
+        self.code_arg: List[object] = []
+        # Node uid -> offset of its code, and code offset -> uids of the nodes the code checks
+        self._code_at: Dict[int, int] = {}
+        self._checks_at: Dict[int, Tuple[int, ...]] = {}
+        # Uids of the conclusions, the only nodes that can be added to true_nodes and that the code must check
+        self._conclusion_uids: Set[int] = {r.conclusions.uid for r in rules}
+        # Fact id -> ids of the rules reading the fact, built by invalidate_from when first needed
+        self._fact_readers: List[List[int]] | None = None
+
+        # Fact ids are the bit positions of parser.fact_bit, so the fact masks of the parser are used as they are
+        all_facts = facts_init
+        for r in rules:
+            all_facts |= r.lhs_mask | r.rhs_mask
+        fact_list = self.fact_list = [None] * all_facts.bit_length()
+        for fid in range(len(fact_list)):
+            if all_facts >> fid & 1:
+                fact_v = fact_list[fid] = self.facts[chr(65 + fid)] = FactV(chr(65 + fid), fid=fid)
+                if facts_init >> fid & 1:
+                    fact_v.state = TRUE
+                    fact_v.initial_fact = True
+
+        # Rules concluding each fact, in file order, split between decisive and disjunctive ones.
+        # The order matters on cycles: the first rule to reach a fact again sees it UNKNOWN.
+        self.fact_to_rules: List[List[int]] = [[] for _ in fact_list]
+        self.fact_to_disjunctive: List[List[int]] = [[] for _ in fact_list]
 
         for idx, r in enumerate(rules):
-            rv = RuleV(idx, r.lhs, r.conclusions, text=r.text)
+            rv = RuleV(idx, r.lhs, r.conclusions, text=r.text,
+                       in_facts_mask=r.lhs_mask, out_facts_mask=r.rhs_mask)
             self.rules.append(rv)
 
-            # premise facts
-            prem_set: Set[str] = set()
-            _collect_facts(r.lhs, prem_set)
-            for f in prem_set:
-                fact_v = fv(f)
-                rv.in_facts.add(fact_v)
-                fact_v.out_rules.add(rv)
-
             # conclusion facts
-            conc_set: Set[str] = set()
-            _collect_facts(r.conclusions, conc_set)
-            for f in conc_set:
-                fact_v = fv(f)
-                rv.out_facts.add(fact_v)
-                fact_v.in_rules.add(rv)
+            if r.conclusions.kind == KIND_FACT:
+                # The most common conclusion, a single fact, guarantees that fact
+                guaranteed, negated = (r.conclusions.name,), ()
+            else:
+                guaranteed, negated = self._conclusion_sets(r.conclusions)
+            for fid in _iter_bits(r.rhs_mask):
+                f = fact_list[fid].name
+                if f in guaranteed:
+                    rv.conc_role[f] = ROLE_GUARANTEES
+                    self.fact_to_rules[fid].append(idx)
+                elif f in negated:
+                    rv.conc_role[f] = ROLE_NEGATES
+                    self.fact_to_rules[fid].append(idx)
+                else:
+                    rv.conc_role[f] = ROLE_DISJUNCTIVE
+                    self.fact_to_disjunctive[fid].append(idx)
 
+    def _compile(self, node: Node) -> int:
+        """
+        Compiles an expression into postfix code and returns the offset of that code.
+        The code of every expression is appended to the same two lists (L{code_op} and
+        L{code_arg}) and ends with OP_RET. AST nodes are hash-consed by the parser (see
+        Node.uid), so the code is cached on the uid: structurally equal expressions share
+        the same code and compiling an expression again does not walk its subtree.
+        AND/OR operands are separated by an OP_SKIP jumping past the right operand when the
+        left one decides the result, and nodes that may be a fired conclusion start with
+        an OP_CHECK against L{true_nodes}.
+
+        @param node: The expression node to compile.
+        @type node: Node
 
-    def collect_conclusion_facts(self, node: Node) -> Set[str]:
+        @return: The offset of the compiled code in L{code_op}.
+        @rtype: int
+        """
+        offset = self._code_at.get(node.uid)
+        if offset is None:
+            offset = self._code_at[node.uid] = len(self.code_op)
+            checks: List[int] = []
+            self._emit(node, checks)
+            self.code_op.append(OP_RET)
+            self.code_arg.append(None)
+            self._checks_at[offset] = tuple(checks)
+        return offset
+
+    def _compile_rule(self, rule: RuleV) -> int:
         """
-        Collects all facts that are part of the mandatory conclusions of a rule.
-        This method traverses the conclusion node and gathers all fact names
-        that are guaranteed to be true when the rule is applied.
+        Compiles the premise of a rule, the first time the rule is evaluated.
+        Doing it on demand keeps the construction of the system cheap: the premises of
+        rules that no query reaches are never compiled.
+
+        @param rule: The rule whose premise is compiled.
+        @type rule: RuleV
+
+        @return: The offset of the compiled premise in L{code_op}.
+        @rtype: int
+        """
+        rule.code_offset = offset = self._compile(rule.premise)
+        rule.premise_checks = self._checks_at[offset]
+        return offset
+
+    def _emit(self, node: Node, checks: List[int]) -> None:
+        """
+        Appends the postfix code of a node and of its children, see L{_compile}.
+        Fact operands, the most common nodes, are emitted in place rather than by a call.
+
+        @param node: The expression node to emit.
+        @type node: Node
+        @param checks: The uids of the nodes checked against L{true_nodes}, appended to as they are emitted.
+        @type checks: List[int]
+
+        @return: None
+        """
+        ops, args = self.code_op, self.code_arg
+        conclusion_uids = self._conclusion_uids
+        check = node.uid in conclusion_uids
+        if check:
+            check_at = len(ops)
+            ops.append(OP_CHECK)
+            args.append(None)
+            checks.append(node.uid)
+        kind = node.kind
+        if kind == KIND_FACT:
+            ops.append(OP_FACT)
+            args.append(node.idx)
+        elif kind == KIND_UNARY:
+            child = node.child
+            if child.kind == KIND_FACT and child.uid not in conclusion_uids:
+                ops.append(OP_FACT)
+                args.append(child.idx)
+            else:
+                self._emit(child, checks)
+            ops.append(OP_NOT)
+            args.append(None)
+        elif kind != KIND_BINARY:
+            raise RuntimeError("Invalid node type in eval_expr")
+        else:
+            first, second = node.left, node.right
+            op = node.op
+            absorbing = _ABSORBING.get(op)
+            if first.kind == KIND_FACT and first.uid not in conclusion_uids:
+                ops.append(OP_FACT)
+                args.append(first.idx)
+            else:
+                self._emit(first, checks)
+            if absorbing is not None:
+                skip_at = len(ops)
+                ops.append(OP_SKIP)
+                args.append(None)
+            if second.kind == KIND_FACT and second.uid not in conclusion_uids:
+                ops.append(OP_FACT)
+                args.append(second.idx)
+            else:
+                self._emit(second, checks)
+            ops.append(OP_BINARY)
+            args.append(_BINARY_TABLES[op])
+            if absorbing is not None:
+                args[skip_at] = (absorbing, len(ops))
+        if check:
+            args[check_at] = (node.uid, len(ops))
+
+    def _conclusion_sets(self, node: Node) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """
+        Returns the facts that a conclusion guarantees to be true and to be false.
+        The walk is done once per distinct conclusion: the result is cached on the
+        hash-consed uid of the node, shared by every rule with the same conclusion.
 
         @param node: The conclusion node to analyze.
         @type node: Node
 
-        @return: A set of fact names that are guaranteed to be true.
-        @rtype: Set[str]
+        @return: The guaranteed facts and the negated facts.
+        @rtype: Tuple[FrozenSet[str], FrozenSet[str]]
         """
-        if isinstance(node, FactNode):
-            return {node.name}
-        if isinstance(node, UnaryNode):
-            return self.collect_conclusion_facts(node.child)
-        if isinstance(node, BinaryNode):
-            return self.collect_conclusion_facts(node.left) | self.collect_conclusion_facts(node.right)
-        return set()
+        sets = self._conclusions.get(node.uid)
+        if sets is None:
+            guaranteed: Set[str] = set()
+            negated: Set[str] = set()
+            node.collect_guaranteed(guaranteed)
+            node.collect_negated(negated)
+            sets = self._conclusions[node.uid] = (frozenset(guaranteed), frozenset(negated))
+        return sets
 
 
-    def query(self, fact: str) -> Truth:
+    def query(self, fact: str) -> int:
         """
         Queries the expert system for the truth value of a given fact.
         This method checks if the fact is known and evaluates it using the rules
@@ -138,152 +359,310 @@ class ExpertSystem:
         @type fact: str
 
         @return: The truth value of the fact (TRUE, FALSE, or UNKNOWN).
-        @rtype: Truth
+        @rtype: int
         """
-        # Check if the fact is already known
-        if self.facts.get(fact) is None:
-            self.reason_log[fact].append(f"No data about {fact}.")
-            return Truth.FALSE
-        return self.solve(fact, set())
-
-    def solve(self, fact: str, path: Set[str]) -> Truth:
+        fact_v = self.facts.get(fact)
+        if fact_v is None:
+            if fact not in self.reason_log:
+                self._log(fact, _NO_DATA)
+            return FALSE
+        # Repeated query: the fact is solved and explained, its state is the answer.
+        # invalidate_from clears the states derived from a fact changed by hand.
+        state = fact_v.state
+        if state is not None and (not self.explain_enabled or fact in self.reason_log):
+            return state
+        return self._eval_iter(_SOLVE, fact_v.fid)
+
+    def solve(self, fact: str) -> int:
         """
-        Recursively evaluates the truth value of a fact using the rules defined in the system.
+        Evaluates the truth value of a fact using the rules defined in the system.
         This method checks if the fact is already known, evaluates it based on the rules,
         and uses memoization to store results for future queries. It also handles cycles
         in the reasoning graph to prevent infinite recursion.
+        The work is done by the iterative evaluator, see L{_eval_iter}.
 
         @param fact: The fact to evaluate.
         @type fact: str
-        @param path: Set of facts currently being evaluated to detect cycles.
-        @type path: Set[str]
 
         @return: The truth value of the fact (TRUE, FALSE, or UNKNOWN).
-        @rtype: Truth
+        @rtype: int
         """
-        # Already known
-        if self.facts[fact].state:
-            if self.facts[fact].state == Truth.TRUE and fact not in self.reason_log:
-                if self.facts[fact].initial_fact:
-                    self.reason_log[fact].append(f"{fact} is an initial fact.")
-                else:
-                    self.reason_log[fact].append(f"{fact} is already known to be TRUE.")
-            elif self.facts[fact].state == Truth.FALSE and fact not in self.reason_log:
-                self.reason_log[fact].append(f"{fact} is already known to be FALSE.")
-            return self.facts[fact].state
-
-        # Avoid infinite recursion (cycles)
-        if fact in path:
-            self.cycles.add(fact)
-            return Truth.UNKNOWN
-        path.add(fact)
-
-        # Try each rule that can conclude fact
-        proved_true  = False
-        proved_false = False
-        unknown_due_to_disjunction = False
-        for rv in self.facts[fact].in_rules:          # global graph lookup
-            rule = self.rules[rv.idx]
-            if rule.truth == Truth.TRUE:
-                res = Truth.TRUE
-            else:
-                res = self.eval_expr(rule.premise, path)
-            if res == Truth.TRUE:
-                self.true_nodes.append(rule.conclusions)
-                if self.conclusion_guarantees_fact(rule.conclusions, fact):
-                    self.reason_log[fact].append(
-                        f"Rule '{rule.text}' fires and conclusively sets {fact} true.")
-                    self.facts[fact].state = Truth.TRUE
-                    proved_true = True
-                elif self.conclusion_negates_fact(rule.conclusions, fact):
-                    self.facts[fact].state = Truth.FALSE
-                    self.reason_log[fact].append(
-                        f"Rule '{rule.text}' fires and conclusively sets {fact} false.")
-                    proved_false = True
-                else:
-                    # Disjunctive conclusion: cannot be sure
-                    unknown_due_to_disjunction = True
-                    self.reason_log[fact].append(
-                        f"Rule '{rule.text}' fires but does not uniquely identify {fact}.")
-            elif res == Truth.UNKNOWN:
-                unknown_due_to_disjunction = True
-        path.remove(fact)
-
-        # ── decide final truth value ─────────────────────────────────────────────
-        if proved_true and proved_false:
-            self.reason_log[fact].append(
-                f"Contradiction: some rules set {fact} true, others false.")
-            self.facts[fact].state = Truth.UNKNOWN
-            return Truth.UNKNOWN
-        if proved_true:
-            self.facts[fact].state = Truth.TRUE
-            return Truth.TRUE
-        if proved_false:
-            self.facts[fact].state = Truth.FALSE
-            return Truth.FALSE
-        if unknown_due_to_disjunction:
-            self.facts[fact].state = Truth.UNKNOWN
-            # log cycle only if it really blocked the answer
-            if fact in self.cycles:
-                self.reason_log[fact].append(
-                    f"Cycle detected while evaluating {fact}.")
-            return Truth.UNKNOWN
-
-        self.facts[fact].state = Truth.FALSE
-        self.reason_log[fact].append(
-            f"No rule proved {fact}; keeping default FALSE.")
-        return Truth.FALSE
+        return self._eval_iter(_SOLVE, self.facts[fact].fid)
 
     # Evaluate arbitrary expression node
-    def eval_expr(self, node: Node, path: Set[str]) -> Truth:
+    def eval_expr(self, node: Node) -> int:
         """
         Evaluates a logical expression represented by a node in the expert system.
-        This method recursively evaluates the expression based on the type of node
+        This method evaluates the expression based on the type of node
         (fact, unary, or binary) and returns the truth value of the expression.
         It handles the evaluation of AND, OR, and XOR operations, as well as negation.
         It also checks for previously computed results to optimize performance.
+        The work is done by the iterative evaluator, see L{_eval_iter}.
 
         @param node: The node representing the logical expression to evaluate.
         @type node: Node
-        @param path: A set of facts currently being evaluated to detect cycles.
-        @type path: Set[str]
 
         @return: The truth value of the evaluated expression (TRUE, FALSE, or UNKNOWN).
-        @rtype: Truth
-        """
-        if self.true_nodes and node in self.true_nodes:
-            return Truth.TRUE
-        # Fact node
-        if isinstance(node, FactNode):
-            return self.solve(node.name, path)
-        # Unary node (negation)
-        if isinstance(node, UnaryNode):
-            child_val = self.eval_expr(node.child, path)
-            if child_val == Truth.UNKNOWN:
-                return Truth.UNKNOWN
-            return Truth.FALSE if child_val == Truth.TRUE else Truth.TRUE
-        # Binary node (AND, OR, XOR)
-        if isinstance(node, BinaryNode):
-            left = self.eval_expr(node.left, path)
-            right = self.eval_expr(node.right, path)
-            op = node.op
-            if op == TokenType.AND:
-                if left == Truth.FALSE or right == Truth.FALSE:
-                    return Truth.FALSE
-                if left == Truth.TRUE and right == Truth.TRUE:
-                    return Truth.TRUE
-                return Truth.UNKNOWN
-            if op == TokenType.OR:
-                if left == Truth.TRUE or right == Truth.TRUE:
-                    return Truth.TRUE
-                if left == Truth.FALSE and right == Truth.FALSE:
-                    return Truth.FALSE
-                return Truth.UNKNOWN
-            if op == TokenType.XOR:
-                if left == Truth.UNKNOWN or right == Truth.UNKNOWN:
-                    return Truth.UNKNOWN
-                return Truth.TRUE if (left == Truth.TRUE) ^ (right == Truth.TRUE) else Truth.FALSE
-        raise RuntimeError("Invalid node type in eval_expr")
+        @rtype: int
+        """
+        return self._eval_iter(_CODE, self._compile(node))
+
+    def _eval_iter(self, kind: int, root) -> int:
+        """
+        Iterative evaluator behind L{solve} and L{eval_expr}.
+        Instead of the mutual recursion solve -> eval_expr -> solve, pending work is kept
+        on an explicit stack of (kind, argument) entries and intermediate truth values on
+        a result stack. Expressions run as the postfix code built by L{_compile}: a small
+        stack machine pushes the values of facts and folds them through the three-valued
+        truth tables of the truth module, and AND/OR short-circuit, so the facts of a
+        skipped right operand are not solved.
+        When the code needs a fact that is not known yet, it is suspended with a _CODE
+        entry holding its next offset and the fact is solved first.
+        A fact is solved through a _SOLVE entry, which opens a L{_SolveFrame},
+        then a _RULES entry which evaluates the premises of its rules one at a time.
+        This avoids one Python frame per visited node and cannot hit the recursion limit.
+        This is a depth-first search with the usual three colours, none of which needs a
+        separate table: a fact is white while its state is None, gray while its bit is set
+        in path and black once its state is set. Meeting a gray fact is a cycle.
+        The gray set is an int bitmask of fact ids, so testing and updating it does not
+        hash anything. It only exists during an evaluation, as a local variable, so callers
+        do not pass a cycle guard around.
+
+        @param kind: The kind of the root entry (_SOLVE for a fact, _CODE for an expression).
+        @type kind: int
+        @param root: The fact id or the offset of the compiled expression to evaluate.
+        @type root: int
+
+        @return: The truth value of the root entry (TRUE, FALSE, or UNKNOWN).
+        @rtype: int
+        """
+        ops, args = self.code_op, self.code_arg
+        fact_list, fact_to_rules, rules = self.fact_list, self.fact_to_rules, self.rules
+        fact_to_disjunctive = self.fact_to_disjunctive
+        reason_log, true_nodes = self.reason_log, self.true_nodes
+        # Without explanations, a known fact never needs to be logged
+        logging = self.explain_enabled
+        path = 0
+        work = [(kind, root)]
+        results: List[int] = []
+        while work:
+            kind, arg = work.pop()
+
+            if kind == _CODE:
+                pc = arg
+                while True:
+                    op = ops[pc]
+                    a = args[pc]
+                    pc += 1
+                    if op == OP_FACT:
+                        fact_v = fact_list[a]
+                        state = fact_v.state
+                        # Not solved (or not explained) yet: suspend the code and solve the fact
+                        if state is None or (logging and fact_v.name not in reason_log):
+                            work.append((_CODE, pc))
+                            work.append((_SOLVE, a))
+                            break
+                        results.append(state)
+                    elif op == OP_BINARY:
+                        right = results.pop()
+                        results[-1] = a[results[-1]][right]
+                    elif op == OP_SKIP:
+                        # FALSE AND x, TRUE OR x: the left value is already the result
+                        if results[-1] == a[0]:
+                            pc = a[1]
+                    elif op == OP_NOT:
+                        results[-1] = NOT_TABLE[results[-1]]
+                    elif op == OP_CHECK:
+                        if a[0] in true_nodes:
+                            results.append(TRUE)
+                            pc = a[1]
+                    else:  # OP_RET
+                        break
+
+            elif kind == _SOLVE:
+                fact_v = fact_list[arg]
+                fact = fact_v.name
+                # Already known
+                if fact_v.state is not None:
+                    if logging and fact not in reason_log:
+                        if fact_v.state == TRUE:
+                            self._log(fact, _INITIAL if fact_v.initial_fact else _KNOWN_TRUE)
+                        elif fact_v.state == FALSE:
+                            self._log(fact, _KNOWN_FALSE)
+                    results.append(fact_v.state)
+                    continue
+
+                # Avoid infinite recursion (cycles)
+                bit = 1 << arg
+                if path & bit:
+                    self.cycles |= bit
+                    results.append(UNKNOWN)
+                    continue
+                path |= bit
+
+                # Try each rule that can conclude fact
+                work.append((_RULES, _SolveFrame(fact, fact_v, iter(fact_to_rules[arg]),
+                                                 fact_to_disjunctive[arg])))
+
+            else:  # _RULES
+                frame = arg
+                fact = frame.fact
+                # Consume the premise result of the rule evaluated last
+                if frame.rule is not None:
+                    res = results.pop()
+                    self._cache_premise(frame.rule, res, path)
+                    self._apply_rule_result(frame, res)
+                # Move on to the next rule that can conclude fact
+                rid = self._next_rule(frame)
+                while rid is not None:
+                    frame.rule = rule = rules[rid]
+                    # Premise value known without running its code
+                    res = rule.cached_premise
+                    if res is not None and rule.premise_checks:
+                        res = self._cached_premise(rule)
+                    if res is None:
+                        offset = rule.code_offset
+                        if offset < 0:
+                            offset = self._compile_rule(rule)
+                        work.append((_RULES, frame))
+                        work.append((_CODE, offset))
+                        break
+                    self._apply_rule_result(frame, res)
+                    rid = self._next_rule(frame)
+                else:
+                    path &= ~(1 << frame.fact_v.fid)
+                    results.append(self._decide(frame))
+
+        return results.pop()
+
+    def _next_rule(self, frame: _SolveFrame) -> int | None:
+        """
+        Returns the id of the next rule to try for the fact of a solve frame.
+        Rules that guarantee or negate the fact come first; the rules that only conclude it
+        disjunctively are tried only if none of them proved the fact true or false,
+        since they could not change the answer then.
+
+        @param frame: The solve frame of the fact being evaluated.
+        @type frame: _SolveFrame
+
+        @return: The id of the next rule, or None when all the rules to try have been tried.
+        @rtype: int | None
+        """
+        rid = next(frame.rules, None)
+        if rid is None and frame.disjunctive and not (frame.proved_true or frame.proved_false):
+            frame.rules, frame.disjunctive = iter(frame.disjunctive), ()
+            rid = next(frame.rules, None)
+        return rid
+
+    def _cache_premise(self, rule: RuleV, res: int, path: int) -> None:
+        """
+        Caches the value of a rule premise when it can only change through L{true_nodes}.
+        That is the case when every fact of the premise is solved for good: it has a state,
+        it is explained (so evaluating it again would not log anything) and it is not
+        being solved on the current path. None of the checked nodes may be in
+        L{true_nodes} yet, as one may have been added after it was checked, and the
+        cache is stale as soon as one of them is added.
+
+        @param rule: The rule whose premise has been evaluated.
+        @type rule: RuleV
+        @param res: The truth value of the premise.
+        @type res: int
+        @param path: Bitmask of the ids of the facts currently being evaluated, to detect cycles.
+        @type path: int
+
+        @return: None
+        """
+        if path & rule.in_facts_mask:
+            return
+        fact_list = self.fact_list
+        for fid in _iter_bits(rule.in_facts_mask):
+            fact_v = fact_list[fid]
+            if fact_v.state is None or (self.explain_enabled and fact_v.name not in self.reason_log):
+                return
+        for uid in rule.premise_checks:
+            if uid in self.true_nodes:
+                return
+        rule.cached_premise = res
+
+    def _cached_premise(self, rule: RuleV) -> int | None:
+        """
+        Returns the cached value of a rule premise, see L{_cache_premise}.
+
+        @param rule: The rule whose premise is about to be evaluated.
+        @type rule: RuleV
+
+        @return: The cached truth value of the premise, or None if it must be evaluated.
+        @rtype: int | None
+        """
+        if rule.cached_premise is None:
+            return None
+        for uid in rule.premise_checks:
+            if uid in self.true_nodes:
+                rule.cached_premise = None
+                return None
+        return rule.cached_premise
+
+    def _apply_rule_result(self, frame: _SolveFrame, res: int) -> None:
+        """
+        Records the outcome of one rule whose premise has been evaluated while solving a fact.
+
+        @param frame: The solve frame of the fact being evaluated.
+        @type frame: _SolveFrame
+        @param res: The truth value of the premise of C{frame.rule}.
+        @type res: int
+
+        @return: None
+        """
+        fact, rule = frame.fact, frame.rule
+        if res == TRUE:
+            self.true_nodes.add(rule.conclusions.uid)
+            role = rule.conc_role[fact]
+            if role == ROLE_GUARANTEES:
+                self._log(fact, _SETS_TRUE, rule.text)
+                frame.fact_v.state = TRUE
+                frame.proved_true = True
+            elif role == ROLE_NEGATES:
+                frame.fact_v.state = FALSE
+                self._log(fact, _SETS_FALSE, rule.text)
+                frame.proved_false = True
+            else:
+                # Disjunctive conclusion: cannot be sure
+                frame.unknown_due_to_disjunction = True
+                self._log(fact, _NOT_UNIQUE, rule.text)
+        elif res == UNKNOWN:
+            frame.unknown_due_to_disjunction = True
+
+    def _decide(self, frame: _SolveFrame) -> int:
+        """
+        Decides the final truth value of a fact once all of its rules have been tried.
+
+        @param frame: The solve frame of the fact being evaluated.
+        @type frame: _SolveFrame
+
+        @return: The truth value of the fact (TRUE, FALSE, or UNKNOWN).
+        @rtype: int
+        """
+        fact, fact_v = frame.fact, frame.fact_v
+        if frame.proved_true and frame.proved_false:
+            self._log(fact, _CONTRADICTION)
+            fact_v.state = UNKNOWN
+            return UNKNOWN
+        if frame.proved_true:
+            fact_v.state = TRUE
+            return TRUE
+        if frame.proved_false:
+            fact_v.state = FALSE
+            return FALSE
+        if frame.unknown_due_to_disjunction:
+            fact_v.state = UNKNOWN
+            # log cycle only if it really blocked the answer
+            if self.cycles >> fact_v.fid & 1:
+                self._log(fact, _CYCLE)
+            return UNKNOWN
+
+        fact_v.state = FALSE
+        self._log(fact, _DEFAULT_FALSE)
+        return FALSE
 
 
     def conclusion_guarantees_fact(self, node: Node, fact: str) -> bool:
@@ -301,16 +680,7 @@ class ExpertSystem:
         @return: True if the conclusion guarantees the fact, False otherwise.
         @rtype: bool
         """
-        # Check if the node is a fact node and matches the fact
-        if isinstance(node, FactNode):
-            return node.name == fact
-        if isinstance(node, BinaryNode):
-            # AND list guarantees each fact
-            if node.op == TokenType.AND:
-                return self.conclusion_guarantees_fact(node.left, fact) or self.conclusion_guarantees_fact(node.right, fact)
-            # OR/XOR do NOT guarantee
-            return False
-        return False
+        return fact in self._conclusion_sets(node)[0]
 
     def conclusion_negates_fact(self, node: Node, fact: str) -> bool:
         """
@@ -327,15 +697,75 @@ class ExpertSystem:
         @return: True if the conclusion negates the fact, False otherwise.
         @rtype: bool
         """
-        if isinstance(node, UnaryNode) and node.op == TokenType.NOT:
-            return isinstance(node.child, FactNode) and node.child.name == fact
-        # Allow lists like  !C + D
-        if isinstance(node, BinaryNode) and node.op == TokenType.AND:
-            return (self.conclusion_negates_fact(node.left,  fact) or
-                    self.conclusion_negates_fact(node.right, fact))
-        return False
+        return fact in self._conclusion_sets(node)[1]
 
     # ---------------------------------------------------------------------
+    def invalidate_from(self, fact: str, keep: int) -> None:
+        """
+        Forgets what has been derived from a fact, before it is changed by hand (interactive mode).
+        Only the facts reachable from it (premise fact, rule reading it, concluded fact) can
+        change with it. They are found by a breadth-first walk over the rules reading each
+        fact; those not in keep are unsolved again, all of them lose their explanation,
+        and the cached premises of the rules reading them are dropped.
+
+        @param fact: The fact about to be changed.
+        @type fact: str
+        @param keep: Bitmask of the facts whose state is kept (see parser.fact_bit).
+        @type keep: int
+
+        @return: None
+        """
+        fact_v = self.facts.get(fact)
+        if fact_v is None:
+            return
+        rules, fact_list = self.rules, self.fact_list
+        readers = self._fact_readers
+        if readers is None:
+            readers = self._fact_readers = [[] for _ in fact_list]
+            for rv in rules:
+                for fid in _iter_bits(rv.in_facts_mask):
+                    readers[fid].append(rv.idx)
+        reached = 1 << fact_v.fid
+        queue = [fact_v.fid]
+        # The queue grows while it is walked, so each reached fact is visited once, in BFS order
+        for fid in queue:
+            fact_v = fact_list[fid]
+            if not keep >> fid & 1:
+                fact_v.state = None
+            self.reason_log.pop(fact_v.name, None)
+            for rid in readers[fid]:
+                rv = rules[rid]
+                rv.cached_premise = None
+                new = rv.out_facts_mask & ~reached
+                if new:
+                    reached |= new
+                    queue.extend(_iter_bits(new))
+
+    def _log(self, fact: str, step: int, rule: str | None = None) -> None:
+        """
+        Appends a reasoning step to the explanation of a fact, if explanations are enabled.
+        The step is stored unformatted, as an index into the templates of _REASONS
+        and the text of the rule involved; only L{explain} builds the message.
+        C{reason_log} is a plain dict written only here, so looking a fact up never
+        inserts an entry for it.
+
+        @param fact: The fact the reasoning step is about.
+        @type fact: str
+        @param step: The index of the reasoning step template.
+        @type step: int
+        @param rule: The text of the rule involved in the step, if any.
+        @type rule: str | None
+
+        @return: None
+        """
+        if not self.explain_enabled:
+            return
+        steps = self.reason_log.get(fact)
+        if steps is None:
+            self.reason_log[fact] = [(step, rule)]
+        else:
+            steps.append((step, rule))
+
     def explain(self, fact: str):
         """
         Prints the reasoning log for a given fact.
@@ -347,8 +777,9 @@ class ExpertSystem:
 
         @return: None
         """
-        if fact in self.reason_log:
-            for line in self.reason_log[fact]:
-                print("  ", line)
+        steps = self.reason_log.get(fact)
+        if steps is not None:
+            for step, rule in steps:
+                print("  ", _REASONS[step].format(fact=fact, rule=rule))
         else:
             print("  No explanation recorded (fact never queried).")
@@ -4,47 +4,43 @@ It includes the `FactV` class for atomic propositions and the `RuleV` class for
 
 Dependencies:
     - dataclasses
-    - typing: Set for type hinting
-    - truth: A module containing the Truth enumeration for representing truth values.
+    - typing: Dict and Tuple for type hinting
+    - truth: A module containing the integer codes for representing truth values.
     - parser: A module containing the Node class for representing nodes in the rule structure.
 """
 
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Set
+from typing import Dict, Tuple
 
-from truth import Truth
+from truth import TRUTH_NAMES
 from parser import Node
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class FactV:
     """
     Vertex for one atomic proposition (fact).
 
     @ivar name: The name of the fact (e.g., 'A', 'B').
     @type name: str
+    @ivar fid: The id of the fact, its index in the expert system fact list.
+    @type fid: int
     @ivar state: The truth value of the fact, which can be TRUE, FALSE, or UNKNOWN.
-    @type state: Truth | None
+    @type state: int | None
     @ivar initial_fact: Whether this fact was in the initial set of facts.
     @type initial_fact: bool
-    @ivar in_rules: A set of rules that conclude this fact.
-    @type in_rules: Set[RuleV]
-    @ivar out_rules: A set of rules that require this fact.
-    @type out_rules: Set[RuleV]
     """
     name: str
-    state: Truth | None = None
+    fid: int = -1
+    state: int | None = None
     initial_fact: bool = False  # whether this fact was in the initial set of facts
-    in_rules: Set["RuleV"] = field(default_factory=set) # rules that conclude this fact
-    out_rules: Set["RuleV"] = field(default_factory=set) # rules that require this fact
 
-    # helpers so we can stick FactV objects in sets
-    def __hash__(self) -> int: return hash(self.name)
-    def __repr__(self) -> str: return f"Fact({self.name},{self.state.name})"
+    # Facts are unique per name (see ExpertSystem), so they hash and compare by identity
+    def __repr__(self) -> str: return f"Fact({self.name},{TRUTH_NAMES[self.state] if self.state is not None else None})"
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class RuleV:
     """
     Vertex for one inference rule.
@@ -55,20 +51,32 @@ class RuleV:
     @type premise: Node
     @ivar conclusions: The conclusions of the rule, represented as a Node.
     @type conclusions: Node
-    @ivar truth: The truth value of the rule, which can be TRUE, FALSE, or UNKNOWN.
-    @type truth: Truth
-    @ivar in_facts: A set of facts that are in the premise of the rule.
-    @type in_facts: Set[FactV]
-    @ivar out_facts: A set of facts that are in the conclusions of the rule.
-    @type out_facts: Set[FactV]
+    @ivar in_facts_mask: Bitmask of the ids of the facts in the premise of the rule.
+    @type in_facts_mask: int
+    @ivar out_facts_mask: Bitmask of the ids of the facts in the conclusions of the rule.
+    @type out_facts_mask: int
+    @ivar text: The original text of the rule, used in explanations.
+    @type text: str
+    @ivar conc_role: The role (ROLE_GUARANTEES, ROLE_NEGATES or ROLE_DISJUNCTIVE of the expert system)
+        of the rule for each fact of its conclusions.
+    @type conc_role: Dict[str, int]
+    @ivar code_offset: The offset of the compiled premise in the expert system code, -1 until
+        the rule is first evaluated.
+    @type code_offset: int
+    @ivar premise_checks: The uids of the premise nodes checked against the expert system true nodes.
+    @type premise_checks: Tuple[int, ...]
+    @ivar cached_premise: The cached truth value of the premise, None when it must be evaluated.
+    @type cached_premise: int | None
     """
     idx: int
     premise: Node
     conclusions: Node
-    truth: Truth = Truth.UNKNOWN
-    in_facts: Set[FactV] = field(default_factory=set) # facts in premise
-    out_facts: Set[FactV] = field(default_factory=set) # facts in conclusion
+    in_facts_mask: int = 0  # bit fid set for each fact in premise
+    out_facts_mask: int = 0 # bit fid set for each fact in conclusion
     text: str = ""
+    conc_role: Dict[str, int] = field(default_factory=dict) # role of the rule for each concluded fact
+    code_offset: int = -1
+    premise_checks: Tuple[int, ...] = ()
+    cached_premise: int | None = None
 
-    def __hash__(self) -> int: return self.idx
     def __repr__(self) -> str: return f"Rule#{self.idx}:{self.text}"
@@ -4,20 +4,18 @@ It processes an input file containing rules, facts, and queries, and provides an
 
 Dependencies:
     - argparse
-    - typing
     - parser: A module to parse the input file and extract rules, facts, and queries.
     - expert_system: A module containing the ExpertSystem class that implements the logic for handling rules and queries.
 
 """
 
 import argparse
-from collections import defaultdict
-from typing import Set
-from parser import parse_file
-from expert_system import ExpertSystem, Truth
+from parser import parse_file, fact_bit, fact_names
+from expert_system import ExpertSystem
+from truth import TRUE, FALSE, TRUTH_NAMES
 
 
-def interactive(es: ExpertSystem, facts_init: Set[str]):
+def interactive(es: ExpertSystem, facts_init: int):
     """
     Interactive mode for the Expert System, allowing users to set facts and query them.
     This function provides a command-line interface where users can:
@@ -27,12 +25,14 @@ def interactive(es: ExpertSystem, facts_init: Set[str]):
 
     @param es: An instance of the ExpertSystem class that manages the facts and rules.
     @type es: ExpertSystem
-    @param facts_init: A set of initial facts.
-    @type facts_init: Set[str]
+    @param facts_init: The bitmask of the initial facts (see parser.fact_bit).
+    @type facts_init: int
 
     @return: None
     """
     print("Entering interactive mode. Commands:\n  +X : set fact X true\n  -X : set fact X false\n  ?X : query fact X\n  /q : quit")
+    # Bitmask of the facts set by hand with +X or -X, kept like the initial facts until set again
+    hand_set = 0
     while True:
         try:
             cmd = input("expert> ").strip().upper()
@@ -45,33 +45,25 @@ def interactive(es: ExpertSystem, facts_init: Set[str]):
             break
         if cmd.startswith("+") and len(cmd) == 2 and cmd[1].isalpha():
             fact = cmd[1]
-            # Reset all non-initial facts to None
-            for name, f in es.facts.items():
-                if f.name not in facts_init:
-                    f.state = None
+            # Reset the facts derived from this one, except the initial and hand-set ones, along with their explanations
+            es.invalidate_from(fact, facts_init | hand_set)
             # Set the fact to True
-            es.facts[fact].state = Truth.TRUE
-            # Add the fact to the initial facts set so it is not reset next time
-            facts_init.add(fact)
-            # Reset reason log to empty for each entry of the dictionary
-            es.reason_log = defaultdict(list)
+            es.facts[fact].state = TRUE
+            # Remember the fact as hand-set so it is not reset next time
+            hand_set |= fact_bit(fact)
             print(f"Set {fact}=True")
             continue
         if cmd.startswith("-") and len(cmd) == 2 and cmd[1].isalpha():
             fact = cmd[1]
-            for name, f in es.facts.items():
-                if f.name not in facts_init:
-                    f.state = None
-            es.facts[fact].state = Truth.FALSE
-            # Remove the fact from the initial facts set so it can be reset next time
-            facts_init.discard(fact)
-            es.reason_log = defaultdict(list)
+            es.invalidate_from(fact, facts_init | hand_set)
+            es.facts[fact].state = FALSE
+            hand_set |= fact_bit(fact)
             print(f"Set {fact}=False")
             continue
         if cmd.startswith("?") and len(cmd) == 2 and cmd[1].isalpha():
             fact = cmd[1]
             res = es.query(fact)
-            print(f"?{fact}: {res}")
+            print(f"?{fact}: {TRUTH_NAMES[res]}")
             es.explain(fact)
             continue
         print("Unrecognised command.")
@@ -84,6 +76,7 @@ def main():
     parser = argparse.ArgumentParser(description="Expert System – Propositional Calculus")
     parser.add_argument("file", help="Path to input file describing rules/facts/queries")
     parser.add_argument("-i", "--interactive", action="store_true", help="Enable interactive mode after processing queries")
+    parser.add_argument("-e", "--explain", action="store_true", help="Print the reasoning behind each answer (always on in interactive mode)")
     args = parser.parse_args()
 
     if not args.file.endswith('.txt'):
@@ -99,15 +92,17 @@ def main():
 
     rules, init_facts, queries = parse_file(args.file)
 
-    print("Initial facts:", " ".join(sorted(init_facts)) or "(none)")
+    print("Initial facts:", " ".join(fact_names(init_facts)) or "(none)")
 
-    es = ExpertSystem(rules, init_facts)
+    # Explanations cost time and memory on every rule firing, only record them when they are printed
+    es = ExpertSystem(rules, init_facts, explain=args.explain or args.interactive)
 
     for q in queries:
         res = es.query(q)
-        print(f"?{q}: {res}")
-        es.explain(q)
-        print()
+        print(f"?{q}: {TRUTH_NAMES[res]}")
+        if es.explain_enabled:
+            es.explain(q)
+            print()
 
     if args.interactive:
         interactive(es, init_facts)
@@ -4,32 +4,26 @@ This script serves as a parser for the Expert System, reading rules, initial fac
 Dependencies:
     - re
     - enum
+    - functools
     - typing
     - dataclasses
 
 """
 
 import re
-from enum import Enum, auto
-from dataclasses import dataclass
-from typing import List, Set, Tuple, Union
+from enum import IntEnum, auto
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple, Union
 
 
 # Tokeniser & Grammar ----------------------------------------------------------
 
-TOKEN_RE = re.compile(r"\s*([A-Z]|!|\+|\||\^|\(|\))\s*")
-"""
-Regular expression to match tokens in the propositional logic expression.
-It matches:
-    - Single uppercase letters (A-Z) representing facts.
-    - Operators: NOT (!), AND (+), OR (|), XOR (^).
-    - Parentheses: left ((), right ()).
-"""
-
-class TokenType(Enum):
+class TokenType(IntEnum):
     """
     Enum representing different types of tokens in propositional logic expressions.
     Each token type corresponds to a specific operator or fact in the logic expression.
+    Token types are ints, so they compare and hash as ints and index the operator tables below.
         - FACT: Represents a propositional fact (single letter).
         - NOT: Represents the negation operator.
         - AND: Represents the logical AND operator.
@@ -61,38 +55,154 @@ _tok_map = {
     ')': TokenType.RPAREN,
 }
 
-@dataclass
-class Token:
+_SKIP = 0
+"""Entry of CHAR_TOKEN for the whitespace characters, skipped by the tokenizer."""
+
+CHAR_TOKEN: Tuple[TokenType | int | None, ...] = tuple(
+    TokenType.FACT if "A" <= chr(code) <= "Z"
+    else _tok_map.get(chr(code), _SKIP if chr(code).isspace() else None)
+    for code in range(256))
+"""
+Character dispatch table of the tokenizer, indexed by character code (for codes below 256).
+It maps:
+    - Single uppercase letters (A-Z) representing facts to TokenType.FACT.
+    - Operators: NOT (!), AND (+), OR (|), XOR (^) and parentheses: left ((), right ()) to their TokenType.
+    - Whitespace to _SKIP.
+    - Every other character to None (not a valid token).
+"""
+
+# AST (Abstract Syntax Tree) ---------------------------------------------------
+
+_interned: Dict[tuple, int] = {}
+"""
+Hash-consing table of the AST: maps the structure of a node, (operator or FACT, then the
+fact letter index or the uids of its children), to the uid shared by all nodes with that structure.
+Cleared by parse_file for each file, with _shared_nodes and the cache of parse_expression.
+"""
+
+def _intern(key: tuple) -> int:
     """
-    Represents a token in the propositional logic expression.
+    Returns the uid of a node structure, allocating the next one the first time it is seen.
+
+    @param key: The structure of the node.
+    @type key: tuple
 
-    @ivar type: The type of the token, which is an instance of TokenType.
-    @type type: TokenType
-    @ivar value: The string representation of the token, such as a fact or operator.
-    @type value: str
+    @return: The uid of the structure.
+    @rtype: int
     """
-    type: TokenType
-    value: str
+    uid = _interned.get(key)
+    if uid is None:
+        uid = _interned[key] = len(_interned)
+    return uid
 
-# AST (Abstract Syntax Tree) ---------------------------------------------------
+def fact_bit(name: str) -> int:
+    """
+    Returns the bit of a fact in a fact bitmask: facts are the letters A-Z, bit 0 being A.
+
+    @param name: The name of the fact, an uppercase letter.
+    @type name: str
+
+    @return: The bit of the fact.
+    @rtype: int
+    """
+    return 1 << (ord(name) - 65)
+
+
+def fact_names(mask: int) -> List[str]:
+    """
+    Returns the names of the facts of a fact bitmask (see L{fact_bit}), in alphabetical order.
+
+    @param mask: The fact bitmask.
+    @type mask: int
+
+    @return: The names of the facts whose bit is set.
+    @rtype: List[str]
+    """
+    return [chr(65 + i) for i in range(mask.bit_length()) if mask >> i & 1]
+
+KIND_FACT = 0
+"""Kind of a FactNode, see Node.kind."""
+KIND_UNARY = 1
+"""Kind of a UnaryNode, see Node.kind."""
+KIND_BINARY = 2
+"""Kind of a BinaryNode, see Node.kind."""
 
 class Node:
     """
     Base class for all nodes in the Abstract Syntax Tree (AST).
+    Every node gets a uid when it is built: structurally equal nodes share the same uid,
+    so two expressions can be compared (or used as a key) through a single int.
+    Each node type has an int class attribute kind (KIND_FACT, KIND_UNARY or KIND_BINARY),
+    so code that needs the type of a node compares one int instead of calling isinstance.
+    Nodes have slots, so these attribute loads do not go through an instance dict.
+    Every node also gets the bitmask of the facts of its expression (facts_mask, see fact_bit),
+    computed from the masks of its children when it is built.
+    Structural walks are methods overridden by each node type, so a visit is one
+    method call instead of a chain of isinstance checks.
     """
-    pass
+    __slots__ = ()
+    kind = -1
+
+    def collect_guaranteed(self, bucket: Set[str]) -> None:
+        """
+        Adds to bucket the facts that the expression guarantees to be true when used as a conclusion,
+        i.e. the facts joined to the rest of it by AND operators only.
+
+        @param bucket: A set to which the fact names will be added.
+        @type bucket: Set[str]
 
-@dataclass
+        @return: None
+        """
+        pass
+
+    def collect_negated(self, bucket: Set[str]) -> None:
+        """
+        Adds to bucket the facts that the expression guarantees to be false when used as a conclusion,
+        i.e. the negated facts joined to the rest of it by AND operators only.
+
+        @param bucket: A set to which the fact names will be added.
+        @type bucket: Set[str]
+
+        @return: None
+        """
+        pass
+
+@dataclass(slots=True)
 class FactNode(Node):
     """
     Represents a fact node in the AST, which corresponds to a propositional fact.
-
-    @ivar name: The name of the fact, typically a single letter.
-    @type name: str
+    The fact is stored as its letter index (0 for A to 25 for Z), so its structure key,
+    its bitmask and its comparisons are on a small int; name gives back the letter.
+
+    @ivar idx: The index of the fact letter, ord(name) - 65.
+    @type idx: int
+    @ivar uid: The hash-consed id of the node.
+    @type uid: int
+    @ivar facts_mask: The bitmask of the fact, see fact_bit.
+    @type facts_mask: int
     """
-    name: str  # single letter
+    idx: int  # letter index, 0 for A
+    uid: int = field(init=False, repr=False, compare=False)
+    facts_mask: int = field(init=False, repr=False, compare=False)
+    kind = KIND_FACT
+
+    def __post_init__(self):
+        self.uid = _intern((TokenType.FACT, self.idx))
+        self.facts_mask = 1 << self.idx
+
+    @property
+    def name(self) -> str:
+        """
+        The name of the fact, a single uppercase letter.
+
+        @rtype: str
+        """
+        return chr(65 + self.idx)
 
-@dataclass
+    def collect_guaranteed(self, bucket: Set[str]) -> None:
+        bucket.add(self.name)
+
+@dataclass(slots=True)
 class UnaryNode(Node):
     """
     Represents a unary operation node in the AST (NOT).
@@ -101,11 +211,26 @@ class UnaryNode(Node):
     @type op: TokenType
     @ivar child: The child node that this unary operation applies to.
     @type child: Node
+    @ivar uid: The hash-consed id of the node.
+    @type uid: int
+    @ivar facts_mask: The bitmask of the facts of the child.
+    @type facts_mask: int
     """
     op: TokenType  # only NOT
     child: Node
+    uid: int = field(init=False, repr=False, compare=False)
+    facts_mask: int = field(init=False, repr=False, compare=False)
+    kind = KIND_UNARY
+
+    def __post_init__(self):
+        self.uid = _intern((self.op, self.child.uid))
+        self.facts_mask = self.child.facts_mask
+
+    def collect_negated(self, bucket: Set[str]) -> None:
+        if self.op == TokenType.NOT and self.child.kind == KIND_FACT:
+            bucket.add(self.child.name)
 
-@dataclass
+@dataclass(slots=True)
 class BinaryNode(Node):
     """
     Represents a binary operation node in the AST (AND, OR, XOR).
@@ -116,66 +241,151 @@ class BinaryNode(Node):
     @type left: Node
     @ivar right: The right child node of the binary operation.
     @type right: Node
+    @ivar uid: The hash-consed id of the node.
+    @type uid: int
+    @ivar facts_mask: The bitmask of the facts of both children.
+    @type facts_mask: int
     """
     op: TokenType  # AND / OR / XOR
     left: Node
     right: Node
+    uid: int = field(init=False, repr=False, compare=False)
+    facts_mask: int = field(init=False, repr=False, compare=False)
+    kind = KIND_BINARY
+
+    def __post_init__(self):
+        self.uid = _intern((self.op, self.left.uid, self.right.uid))
+        self.facts_mask = self.left.facts_mask | self.right.facts_mask
+
+    def collect_guaranteed(self, bucket: Set[str]) -> None:
+        # AND list guarantees each fact, OR/XOR do not
+        if self.op == TokenType.AND:
+            self.left.collect_guaranteed(bucket)
+            self.right.collect_guaranteed(bucket)
+
+    def collect_negated(self, bucket: Set[str]) -> None:
+        # Allow lists like  !C + D
+        if self.op == TokenType.AND:
+            self.left.collect_negated(bucket)
+            self.right.collect_negated(bucket)
 
 # Parser (shunting‑yard) -------------------------------------------------------
 
-PRECEDENCE = {
+_BINARY_OPS = frozenset((TokenType.AND, TokenType.OR, TokenType.XOR))
+"""
+The binary operator token types.
+"""
+
+_PRECEDENCE_LEVELS = {
     TokenType.NOT: 4,
     TokenType.AND: 3,
     TokenType.XOR: 2,
     TokenType.OR: 1,
 }
+
+PRECEDENCE: Tuple[int, ...] = tuple(_PRECEDENCE_LEVELS.get(t, 0) for t in range(len(TokenType) + 1))
 """
-Precedence levels for operators in propositional logic.
+Precedence levels for operators in propositional logic, indexed by token type (0 for non-operators).
 The higher the number, the higher the precedence.
 Precedence is used to determine the order of operations in expressions.
 """
 
-LEFT_ASSOC = {TokenType.AND, TokenType.OR, TokenType.XOR}
+LEFT_ASSOC: Tuple[bool, ...] = tuple(t in (TokenType.AND, TokenType.OR, TokenType.XOR)
+                                     for t in range(len(TokenType) + 1))
 """
+Whether each token type is a left associative operator, indexed by token type.
 Left associative operators are evaluated left to right.
 Associativity defines how operators of the same precedence are grouped
 """
-RIGHT_ASSOC = {TokenType.NOT}
+RIGHT_ASSOC: Tuple[bool, ...] = tuple(t == TokenType.NOT for t in range(len(TokenType) + 1))
 """
+Whether each token type is a right associative operator, indexed by token type.
 Right associative operators are evaluated right to left.
 """
 
+POPS_BEFORE: Tuple[Tuple[bool, ...], ...] = tuple(
+    tuple(bool(PRECEDENCE[top]) and (
+        (LEFT_ASSOC[top] and PRECEDENCE[top] >= PRECEDENCE[tok]) or
+        (RIGHT_ASSOC[top] and PRECEDENCE[top] > PRECEDENCE[tok]))
+        for top in range(len(TokenType) + 1))
+    for tok in range(len(TokenType) + 1))
+"""
+Shunting-yard decisions, precomputed from the tables above: POPS_BEFORE[tok][top] tells whether
+the operator top of the stack is popped to the output before the operator tok is pushed.
+"""
+
+_FLAT_RE = re.compile(r"[A-Z](?:\s*\+\s*[A-Z])+|[A-Z](?:\s*\|\s*[A-Z])+|[A-Z](?:\s*\^\s*[A-Z])+")
+"""
+Regular expression matching a flat expression: facts joined by a single binary operator (e.g. 'A + B + C').
+Such an expression (like a single fact) is built directly by parse_expression, without the shunting-yard.
+"""
+
+_OP_OF_CHAR = {'+': TokenType.AND, '|': TokenType.OR, '^': TokenType.XOR}
+"""
+The binary operator of each operator character of a flat expression.
+"""
+
+_shared_nodes: Dict[tuple, Node] = {}
+"""
+The nodes built by the parser, keyed by their structure (the keys of _interned): structurally
+equal subexpressions, within an expression or across rules, are one shared node object.
+"""
+
+def _shared_node(key: tuple, node_type: type, *fields) -> Node:
+    """
+    Returns the node with a given structure, building it the first time it is seen.
+
+    @param key: The structure of the node, see _interned.
+    @type key: tuple
+    @param node_type: The class of the node (FactNode, UnaryNode or BinaryNode).
+    @type node_type: type
+    @param fields: The fields of the node, passed to node_type when it is built.
 
-def tokenize(expr: str) -> List[Token]:
+    @return: The shared node.
+    @rtype: Node
+    """
+    node = _shared_nodes.get(key)
+    if node is None:
+        node = _shared_nodes[key] = node_type(*fields)
+    return node
+
+
+def tokenize(expr: str) -> List[Union[TokenType, str]]:
     """
     Tokenizes the input expression string into a list of tokens.
+    Every token is a single character, so the expression is scanned once and each
+    character is classified by a lookup in L{CHAR_TOKEN}.
+    A fact token is the name of the fact (a str), any other token is its TokenType:
+    no token object is allocated.
 
     @param expr: The input expression string to tokenize.
     @type expr: str
 
     @return: A list of tokens parsed from the expression.
-    @rtype: List[Token]
+    @rtype: List[Union[TokenType, str]]
     """
-    pos = 0
-    tokens: List[Token] = []
-    while pos < len(expr):
-        m = TOKEN_RE.match(expr, pos)
-        if not m:
+    tokens: List[Union[TokenType, str]] = []
+    table = CHAR_TOKEN
+    for pos, c in enumerate(expr):
+        code = ord(c)
+        token_type = table[code] if code < 256 else (_SKIP if c.isspace() else None)
+        if token_type == TokenType.FACT:
+            tokens.append(c)
+        elif token_type:
+            tokens.append(token_type)
+        elif token_type is None:
             raise ValueError(f"Bad token at pos {pos}: …{expr[pos:pos+10]}")
-        raw = m.group(1)
-        pos = m.end()
-        if raw.isalpha():
-            tokens.append(Token(TokenType.FACT, raw))
-        else:
-            tokens.append(Token(_tok_map[raw], raw))
     return tokens
 
 
+@lru_cache(maxsize=4096)
 def parse_expression(expr: str) -> Node:
     """
     Parses a propositional logic expression into an Abstract Syntax Tree (AST).
     This function uses the shunting-yard algorithm to convert infix notation
     to postfix notation and then builds the AST from the postfix tokens.
+    Results are cached by expression text: an expression repeated across rules is parsed
+    once and its rules share the same AST, which is never modified after parsing.
 
     @param expr: The input expression string in propositional logic.
     @type expr: str
@@ -183,65 +393,82 @@ def parse_expression(expr: str) -> Node:
     @return: The root node of the AST representing the expression.
     @rtype: Node
     """
-    output: List[Union[Token, Node]] = []
-    stack: List[Token] = []
+    # Fast paths for the most common shapes: a single fact, and facts joined by one operator
+    if len(expr) == 1 and "A" <= expr <= "Z":
+        idx = ord(expr) - 65
+        return _shared_node((TokenType.FACT, idx), FactNode, idx)
+    if _FLAT_RE.fullmatch(expr):
+        op = _OP_OF_CHAR[expr[1:].lstrip()[0]]
+        node = None
+        for c in expr:
+            if "A" <= c <= "Z":
+                idx = ord(c) - 65
+                fact = _shared_node((TokenType.FACT, idx), FactNode, idx)
+                node = fact if node is None else _shared_node((op, node.uid, fact.uid), BinaryNode, op, node, fact)
+        return node
+
+    output: List[Node] = []
+    stack: List[TokenType] = []
+    # Bound methods and tables read for every token, as locals
+    out_app, out_pop, stk_app, stk_pop = output.append, output.pop, stack.append, stack.pop
+    pops_before, shared = POPS_BEFORE, _shared_node
+    NOT, LPAREN = TokenType.NOT, TokenType.LPAREN
     for tok in tokenize(expr):
-        if tok.type == TokenType.FACT:
-            output.append(FactNode(tok.value))
-        elif tok.type == TokenType.NOT:
-            stack.append(tok)
-        elif tok.type in (TokenType.AND, TokenType.OR, TokenType.XOR):
-            while stack and stack[-1].type in PRECEDENCE and (
-                    (stack[-1].type in LEFT_ASSOC and PRECEDENCE[stack[-1].type] >= PRECEDENCE[tok.type]) or
-                    (stack[-1].type in RIGHT_ASSOC and PRECEDENCE[stack[-1].type] > PRECEDENCE[tok.type])
-            ):
-                pop_to_output(stack, output)
-            stack.append(tok)
-        elif tok.type == TokenType.LPAREN:
-            stack.append(tok)
-        elif tok.type == TokenType.RPAREN:
-            while stack and stack[-1].type != TokenType.LPAREN:
-                pop_to_output(stack, output)
+        if isinstance(tok, str):
+            idx = ord(tok) - 65
+            out_app(shared((TokenType.FACT, idx), FactNode, idx))
+        elif tok == NOT or tok == LPAREN:
+            stk_app(tok)
+        elif tok in _BINARY_OPS:
+            pops = pops_before[tok]
+            while stack and pops[stack[-1]]:
+                # Pop the operator to the output, building its node from its operands
+                op = stk_pop()
+                if op == NOT:
+                    assert output, "Unary op with no operand"
+                    child = out_pop()
+                    out_app(shared((op, child.uid), UnaryNode, op, child))
+                else:
+                    right = out_pop()
+                    left = out_pop()
+                    out_app(shared((op, left.uid, right.uid), BinaryNode, op, left, right))
+            stk_app(tok)
+        elif tok == TokenType.RPAREN:
+            while stack and stack[-1] != LPAREN:
+                op = stk_pop()
+                if op == NOT:
+                    assert output, "Unary op with no operand"
+                    child = out_pop()
+                    out_app(shared((op, child.uid), UnaryNode, op, child))
+                else:
+                    right = out_pop()
+                    left = out_pop()
+                    out_app(shared((op, left.uid, right.uid), BinaryNode, op, left, right))
             if not stack:
                 raise ValueError("Mismatched parentheses")
-            stack.pop()  # remove LPAREN
+            stk_pop()  # remove LPAREN
         else:
             raise ValueError(f"Unsupported token {tok}")
     while stack:
-        if stack[-1].type in (TokenType.LPAREN, TokenType.RPAREN):
+        op = stk_pop()
+        if op == LPAREN or op == TokenType.RPAREN:
             raise ValueError("Mismatched parentheses at end")
-        pop_to_output(stack, output)
+        if op == NOT:
+            assert output, "Unary op with no operand"
+            child = out_pop()
+            out_app(shared((op, child.uid), UnaryNode, op, child))
+        else:
+            right = out_pop()
+            left = out_pop()
+            out_app(shared((op, left.uid, right.uid), BinaryNode, op, left, right))
     if not(len(output) == 1 and isinstance(output[0], Node)): # ensure single root node
         raise ValueError("No single root node in output")
-    return output[0]  # type: ignore[index]
-
-
-def pop_to_output(stack: List[Token], output: List[Union[Token, Node]]):
-    """
-    Pops an operator from the stack and creates a node in the output.
-    This function handles both unary and binary operators, creating the appropriate AST nodes.
-
-    @param stack: The stack containing tokens, where the top is the operator to pop.
-    @type stack: List[Token]
-    @param output: The output list where the resulting AST nodes will be appended.
-    @type output: List[Union[Token, Node]]
-
-    @return: None
-    """
-    op_tok = stack.pop()
-    if op_tok.type == TokenType.NOT:
-        assert output, "Unary op with no operand"
-        child = output.pop()
-        output.append(UnaryNode(op_tok.type, child))
-    else:
-        right = output.pop()
-        left = output.pop()
-        output.append(BinaryNode(op_tok.type, left, right))
+    return output[0]
 
 
 #  Rule Representation ---------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class Rule:
     """
     Represents a rule in the expert system.
@@ -253,15 +480,25 @@ class Rule:
     @type conclusions: Node
     @ivar text: The original text of the rule for explanations and debugging.
     @type text: str
+    @ivar lhs_mask: The bitmask of the facts of the left-hand side, see fact_bit.
+    @type lhs_mask: int
+    @ivar rhs_mask: The bitmask of the facts of the conclusions, see fact_bit.
+    @type rhs_mask: int
     """
     lhs: Node
     conclusions: Node  # may be BinaryNode with OR/XOR/AND or single FactNode
     text: str  # original text for explanations
+    lhs_mask: int = field(init=False, repr=False)
+    rhs_mask: int = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.lhs_mask = self.lhs.facts_mask
+        self.rhs_mask = self.conclusions.facts_mask
 
 
 # File Parsing -----------------------------------------------------------------
 
-def parse_file(path: str) -> Tuple[List[Rule], Set[str], List[str]]:
+def parse_file(path: str) -> Tuple[List[Rule], int, List[str]]:
     """
     Parses a file containing rules, initial facts, and queries for the expert system.
     The file format is expected to have:
@@ -269,18 +506,26 @@ def parse_file(path: str) -> Tuple[List[Rule], Set[str], List[str]]:
         - Lines starting with '?' to denote queries.
         - Lines containing rules in the format 'A => B' or 'A <=> B', where A and B are propositional expressions.
         - Lines can also contain comments starting with '#'.
-    The function returns a list of rules, a set of initial facts, and a list of queries.
+    The function returns a list of rules, the initial facts, and a list of queries.
+    Facts being the 26 letters A-Z, the initial facts are a bitmask (see L{fact_bit})
+    rather than a set of strings.
+    The nodes are shared across the rules of one file only: the hash-consing tables and the
+    cache of L{parse_expression} are cleared first, so they do not grow with every file parsed.
 
     @param path: The path to the file containing rules, facts, and queries.
     @type path: str
     @return: A tuple containing:
         - A list of Rule objects representing the rules in the file.
-        - A set of initial facts (single letters).
+        - The bitmask of the initial facts (single letters).
         - A list of queries (single letters).
-    @rtype: Tuple[List[Rule], Set[str], List[str]]
+    @rtype: Tuple[List[Rule], int, List[str]]
     """
+    # Cleared together, as the cached ASTs hold the uids of _interned
+    _shared_nodes.clear()
+    _interned.clear()
+    parse_expression.cache_clear()
     rules: List[Rule] = []
-    initial_facts: Set[str] = set()
+    initial_facts = 0
     queries: List[str] = []
     with open(path, "r", encoding="utf-8") as f:
         for raw in f:
@@ -293,7 +538,7 @@ def parse_file(path: str) -> Tuple[List[Rule], Set[str], List[str]]:
                     if c.isspace():
                         continue
                     if c.isalpha() and c.isupper():
-                        initial_facts.add(c)
+                        initial_facts |= fact_bit(c)
                     else:
                         raise ValueError(
                             f"Invalid initial fact '{c}' in line: {raw.rstrip()}\n"
@@ -311,19 +556,17 @@ def parse_file(path: str) -> Tuple[List[Rule], Set[str], List[str]]:
                             f"Invalid fact to query '{c}' in line: {raw.rstrip()}\n"
                             "Facts must be uppercase letters (A-Z).")
                 continue
-            # Must be a rule
-            if "<=>" in line:
-                lhs_txt, rhs_txt = map(str.strip, line.split("<=>"))
-                lhs_expr = parse_expression(lhs_txt)
-                rhs_expr = parse_expression(rhs_txt)
-                # Biconditional => two rules
-                rules.append(Rule(lhs=lhs_expr, conclusions=rhs_expr, text=line.strip()))
-                rules.append(Rule(lhs=rhs_expr, conclusions=lhs_expr, text=line.strip()))
-            elif "=>" in line:
-                lhs_txt, rhs_txt = map(str.strip, line.split("=>"))
-                lhs_expr = parse_expression(lhs_txt)
-                rhs_expr = parse_expression(rhs_txt)
-                rules.append(Rule(lhs=lhs_expr, conclusions=rhs_expr, text=line.strip()))
-            else:
+            # Must be a rule: split it once on its arrow, '<=>' being '=>' preceded by '<'
+            lhs_txt, arrow, rhs_txt = line.partition("=>")
+            if not arrow or "=>" in rhs_txt:
                 raise ValueError(f"Malformed rule: {line}")
-    return rules, initial_facts, queries
\ No newline at end of file
+            biconditional = lhs_txt.endswith("<")
+            if biconditional:
+                lhs_txt = lhs_txt[:-1]
+            lhs_expr = parse_expression(lhs_txt.strip())
+            rhs_expr = parse_expression(rhs_txt.strip())
+            rules.append(Rule(lhs=lhs_expr, conclusions=rhs_expr, text=line))
+            if biconditional:
+                # Biconditional => two rules
+                rules.append(Rule(lhs=rhs_expr, conclusions=lhs_expr, text=line))
+    return rules, initial_facts, queries
@@ -1,28 +1,53 @@
 """
-This script defines the `Truth` enumeration for the Expert System based on Propositional Calculus.
+This script defines the truth values for the Expert System based on Propositional Calculus.
 It represents the truth values of facts, which can be TRUE, FALSE, or UNKNOWN.
 
-Dependencies:
-    - enum
+Truth values are plain integer codes rather than an enumeration: the evaluator compares
+them in its innermost loop, and an int comparison is a single C-level operation
+while an Enum comparison goes through attribute lookup and rich-comparison dispatch.
 
 """
 
-from enum import Enum, auto
+FALSE = 0
+"""Represents a fact that is false."""
+TRUE = 1
+"""Represents a fact that is true."""
+UNKNOWN = 2
+"""Represents a fact whose truth value is unknown."""
 
-class Truth(Enum):
-    """
-    Represents the truth value of a fact in the expert system.
+TRUTH_NAMES = ("FALSE", "TRUE", "UNKNOWN")
+"""
+Printable name of each truth value, indexed by its code.
+"""
+
+NOT_TABLE = (TRUE, FALSE, UNKNOWN)
+"""
+Three-valued NOT, indexed by the truth value of the operand.
+"""
+
+AND_TABLE = (
+    (FALSE, FALSE, FALSE),
+    (FALSE, TRUE, UNKNOWN),
+    (FALSE, UNKNOWN, UNKNOWN),
+)
+"""
+Three-valued AND, indexed by the truth values of the left then the right operand.
+"""
 
-    @ivar TRUE: Represents a fact that is true.
-    @type TRUE: Truth
-    @ivar FALSE: Represents a fact that is false.
-    @type FALSE: Truth
-    @ivar UNKNOWN: Represents a fact whose truth value is unknown.
-    @type UNKNOWN: Truth
-    """
-    TRUE = auto()
-    FALSE = auto()
-    UNKNOWN = auto()
+OR_TABLE = (
+    (FALSE, TRUE, UNKNOWN),
+    (TRUE, TRUE, TRUE),
+    (UNKNOWN, TRUE, UNKNOWN),
+)
+"""
+Three-valued OR, indexed by the truth values of the left then the right operand.
+"""
 
-    def __str__(self):
-        return self.name
\ No newline at end of file
+XOR_TABLE = (
+    (FALSE, TRUE, UNKNOWN),
+    (TRUE, FALSE, UNKNOWN),
+    (UNKNOWN, UNKNOWN, UNKNOWN),
+)
+"""
+Three-valued XOR, indexed by the truth values of the left then the right operand.
+"""